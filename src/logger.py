@@ -0,0 +1,216 @@
+"""
+Logging helpers for the scraper:
+    (*) configure - sets up level, console output and the json event file
+    (*) get_logger - returns the scraper logger
+    (*) log_event - logs a structured (json) event
+    (*) ProgressReporter - rate-limited progress line with throughput and ETA
+
+Records are handed to a background thread through a queue, so the scraping
+loop never blocks on console or file writes.
+"""
+
+# Generic/Built-in
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+
+# Owned
+import folderops
+
+
+__author__ = 'Selma Suloglu'
+__copyright__ = 'Copyright 2020'
+__credits__ = ['Selma Suloglu']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = 'Selma Suloglu'
+__status__ = 'Dev'
+
+
+LOGGER_NAME = 'chromium_issue_collection'
+CONSOLE_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+_listener = None
+_events_written = False
+_events_warned = False
+
+
+# {code}
+class JsonFormatter(logging.Formatter):
+    """ Formats a record as a single line json object. Structured events
+        (see log_event) are merged into the object.
+    """
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage()
+        }
+        data.update(getattr(record, 'event', {}))
+        return json.dumps(data)
+
+
+class EventFilter(logging.Filter):
+    """ Passes only structured events or, if 'exclude' is set, everything else. """
+    def __init__(self, exclude=False):
+        logging.Filter.__init__(self)
+        self.exclude = exclude
+
+    def filter(self, record):
+        return hasattr(record, 'event') != self.exclude
+
+
+def configure(level=logging.INFO, events_filename=None, log_queue=None):
+    """ Configures the scraper logger. Console output and, if 'events_filename'
+        is provided, json events are written by a background listener.
+        Structured events reach the console only at DEBUG level.
+
+        Args:
+            level (int): logging level, e.g. logging.DEBUG
+            events_filename (string): name of the file (json lines) structured
+                                      events are appended to
+            log_queue (queue.Queue): queue records are passed through, a new
+                                     one is created if not provided
+    """
+    global _listener, _events_written, _events_warned
+    stop()
+    _events_written = bool(events_filename) or level <= logging.DEBUG
+    _events_warned = False
+
+    handlers = []
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    if level > logging.DEBUG:
+        console.addFilter(EventFilter(exclude=True))
+    handlers.append(console)
+
+    if events_filename:
+        folderops.create_folder(os.path.dirname(os.path.abspath(events_filename)))
+        events = logging.FileHandler(events_filename, mode='a')
+        events.setFormatter(JsonFormatter())
+        events.addFilter(EventFilter())
+        handlers.append(events)
+
+    log_queue = log_queue if log_queue is not None else queue.Queue(-1)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers,
+                                               respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+def stop():
+    """ Flushes pending records and stops the background listener
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger():
+    """ Returns the scraper logger, configuring it with defaults
+        if configure was not called before
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        configure()
+    return logger
+
+
+def log_event(name, level=logging.INFO, **fields):
+    """ Logs a structured event, e.g. log_event('issue', issue_id='1', outcome='ok').
+        Warns once if events are neither written to a file nor to the console.
+
+        Args:
+            name (string): event name
+            level (int): logging level
+            fields (dict): event fields
+    """
+    global _events_warned
+    logger = get_logger()
+    if not _events_written and not _events_warned:
+        _events_warned = True
+        logger.warning('[-] Structured events are dropped, pass events_filename to logger.configure')
+    if logger.isEnabledFor(level):
+        event = {'event': name}
+        event.update(fields)
+        logger.log(level, '%s %s', name,
+                   ' '.join(['%s=%s' %(k, v) for k, v in fields.items()]),
+                   extra={'event': event})
+
+
+class ProgressReporter():
+    """ Counts processed items and logs a progress line (throughput and ETA)
+        at most once per 'interval' seconds.
+    """
+    def __init__(self, total=None, interval=10.0, label='issues'):
+        """ Args:
+                total (int): number of items to be processed, if known
+                interval (float): minimum number of seconds between progress lines
+                label (string): name of the items in the progress line
+        """
+        self.total = total
+        self.interval = interval
+        self.label = label
+        self.count = 0
+        self.start_time = time.monotonic()
+        self.last_report = self.start_time
+
+
+    def update(self, n=1):
+        """ Adds 'n' processed items and logs progress if 'interval' has passed
+
+            Args:
+                n (int): number of processed items
+        """
+        self.count += n
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report(now)
+
+
+    def finish(self):
+        """ Logs the final progress line
+        """
+        self.report(time.monotonic())
+
+
+    def report(self, now):
+        """ Logs a progress line with throughput and, if total is known, ETA
+
+            Args:
+                now (float): current time in seconds (time.monotonic)
+        """
+        elapsed = now - self.start_time
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            remaining = max(self.total - self.count, 0)
+            eta = self.__format_seconds(remaining / rate) if rate > 0 else '--:--:--'
+            get_logger().info('[*] %d/%d %s (%.1f%%) | %.2f %s/s | ETA %s', self.count, self.total,
+                              self.label, 100.0 * self.count / self.total, rate, self.label, eta)
+        else:
+            get_logger().info('[*] %d %s | %.2f %s/s', self.count, self.label, rate, self.label)
+
+
+    def __format_seconds(self, seconds):
+        """ Formats 'seconds' as H:MM:SS (hours are not wrapped at 24)
+
+            Args:
+                seconds (float): number of seconds
+        """
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return '%d:%02d:%02d' %(hours, minutes, seconds)
+
+
+atexit.register(stop)
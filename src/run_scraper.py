@@ -1,6 +1,10 @@
 
+# Generic/Built-in
+import logging
+
 # Owned
 import folderops
+import logger
 from scraper import Scraper
 from filereader import CsvFileReader as cr 
 
@@ -21,7 +25,7 @@ def collect_issues(key):
         Args:
             key (string): query key, either 'all' or 'CVE'
     """
-    print(" [*] Collecting issues ...")
+    logger.get_logger().info('[*] Collecting issues ...')
     return Scraper().collect_issues(key)
     
 
@@ -37,31 +41,36 @@ def process_issue_info(issues):
     return {r[col_names['issue_id']]:r[col_names['issue_type']] for r in issues[1:]}
     
             
-def collect_comments(key, filename=None):
+def collect_comments(key, filename=None, workers=0):
     """ Collects comments for the list of issues in the filename
         If filename does not exist, first gathers issue data and
         then collects associated comments
 
         Args:
             filename (string): a csv file name including a set of issueids 
+            workers (int): number of supervised browser worker processes,
+                           0 to scrape in this process
     """
     if not filename:
         # Collect issue data associated with CVEs
         filename = collect_issues(key)
 
-    print(" [*] Collecting comments ...")
+    logger.get_logger().info('[*] Collecting comments ...')
     if folderops.file_exist(filename):
         issues = process_issue_info(cr().read(filename))
-        Scraper().collect_comments('one', issues)
+        Scraper().collect_comments('one', issues, workers=workers)
 
 
 
 if __name__ == "__main__":
+    # Progress on the console, one json event per scraped issue in logs/
+    logger.configure(level=logging.INFO, events_filename='logs/scraper_events.jsonl')
+
     # Collect all issue ids
     collect_issues("all")
         
     # Collect comments with a given issue list
     collect_comments('CVE', 'inputs/sample_issue_list.csv')
-    # Collect comments without an issue list
-    collect_comments('CVE')
+    # Collect comments without an issue list, with 2 supervised browser workers
+    collect_comments('CVE', workers=2)
 
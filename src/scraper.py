@@ -3,15 +3,18 @@ import os
 import re
 import csv
 import time
+import functools
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException, WebDriverException
 
 # Owned
 import folderops
+import logger
+import supervisor
 from filereader import TxtFileReader as tfr
 
 
@@ -72,6 +75,14 @@ class Scraper():
                               'issue_status' : '.col-status',
                               'issue_components' : '.col-component'}
 
+    # tag name of the element in the list page (mr-list-page shadow root) whose text 
+    # ends with the issue count, e.g. '1 - 100 of 12345'. Not verified against the
+    # current tracker, if it is missing progress of collect_issues has no ETA
+    issue_count_tag_name = 'mr-pagination'
+
+    # seconds to wait for a page to load
+    page_load_timeout = 60
+
     def __init__(self):
         """ Creates the output file with headers
 
@@ -110,7 +121,7 @@ class Scraper():
             element = root.find_element_by_tag_name(tag_name)
             return self.driver.execute_script('return arguments[0].shadowRoot', element)
         except NoSuchElementException:
-            print ('Unable to locate element - %s'%tag_name)
+            logger.get_logger().warning('Unable to locate element - %s', tag_name)
             return None
 
 
@@ -125,7 +136,7 @@ class Scraper():
             element = root.find_element_by_css_selector(css_selector)
             return self.driver.execute_script('return arguments[0].shadowRoot', element)
         except NoSuchElementException:
-            print ('Unable to locate element - %s'%css_selector)
+            logger.get_logger().warning('Unable to locate element - %s', css_selector)
             return None
 
 
@@ -213,7 +224,7 @@ class Scraper():
         comments_root = self.__expand_shadow_element_by_tag_name(root, 'mr-comment-list')
 
         list_of_comments = comments_root.find_elements_by_tag_name('mr-comment')
-        print ('[*] %d comments' %len(list_of_comments))
+        logger.get_logger().debug('[*] %d comments', len(list_of_comments))
         comments = []
         for c in list_of_comments:
             comment_root = self.__expand_shadow_element(c)
@@ -267,7 +278,7 @@ class Scraper():
         else:
             csv_content.append(issue_content)
 
-        print(csv_content)
+        logger.get_logger().debug('[*] %d rows appended', len(csv_content))
         with open(self.queries[self.key]['output_filename'], 'a+') as f:
             writer = csv.writer(f, delimiter=',')
             writer.writerows(csv_content)
@@ -292,7 +303,11 @@ class Scraper():
                 root (selenium.webdriver.chrome.webdriver.WebDriver) : web element
                 tag_name (string): html tag name        
         """
-        s = root.find_element_by_tag_name(tag_name).text.strip('\n\r ')
+        try:
+            s = root.find_element_by_tag_name(tag_name).text.strip('\n\r ')
+        except NoSuchElementException:
+            logger.get_logger().warning('Unable to locate element - %s', tag_name)
+            return None
         m = re.match(self.issue_count_pattern, s) 
         return int(m.group(1)) if m else None 
         
@@ -303,19 +318,35 @@ class Scraper():
             Args:
                 url (string) : url
         """
-        self.driver = webdriver.Chrome()
+        self.driver = None
         try:
+            self.driver = webdriver.Chrome()
+            self.driver.set_page_load_timeout(self.page_load_timeout)
             self.driver.get(url)
             WebDriverWait(self.driver, 15).until(
                 ec.visibility_of_element_located((By.TAG_NAME, 'mr-app'))
             )
             self.driver.implicitly_wait(25)
         except TimeoutException as e:
-            print ('[-] TimeoutException')
-            self.driver.quit()
+            logger.get_logger().error('[-] TimeoutException - %s', url)
+            self.__quit_driver()
         except StaleElementReferenceException as e:
-            print ('[-] StaleElementReferenceException')
-            self.driver.quit()
+            logger.get_logger().error('[-] StaleElementReferenceException - %s', url)
+            self.__quit_driver()
+        except WebDriverException as e:
+            logger.get_logger().error('[-] WebDriverException - %s: %s', url, e.msg)
+            self.__quit_driver()
+
+
+    def __quit_driver(self):
+        """ Quits the web driver, if any, ignoring errors of an already broken session
+        """
+        if self.driver:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+        self.driver = None
 
 
     def __extract_list(self, rows):
@@ -333,6 +364,7 @@ class Scraper():
                 text = r.find_element_by_css_selector(self.css_selector_by_header[h]).text.strip('\n\r ')
                 data[h] = self.__process_text(text) if h=='issue_components' else text 
             self.__append_to_csv(data)
+            self.progress.update()
 
 
     def __collect_issue_list_in_single_page(self, ind):
@@ -344,11 +376,20 @@ class Scraper():
         """
         self.__create_driver(self.queries[self.key]['urlbase']+str(ind))
 
-        list_root = self.__get_page('mr-list-page')
+        list_root = self.__get_page('mr-list-page') if self.driver else None
         if not list_root: 
-            self.driver.quit()
+            self.__quit_driver()
+            self.progress.finish()
             return
         
+        # looked up once per run, progress is reported without ETA if it fails
+        if not self.issue_count_checked:
+            self.issue_count_checked = True
+            self.progress.total = self.__get_issue_count(list_root, self.issue_count_tag_name)
+            if self.progress.total is None:
+                logger.get_logger().warning('[-] Issue count not found in <%s>, progress is reported without ETA',
+                                            self.issue_count_tag_name)
+
         issue_list_root = self.__expand_shadow_element_by_css_selector(list_root, 'mr-issue-list')
         issue_list_table = issue_list_root.find_elements_by_css_selector('table tbody tr')
         self.__extract_list(issue_list_table)
@@ -370,46 +411,108 @@ class Scraper():
         self.key = key
         self.__create_output_file()
 
-        print('[+] Scraping content for query: <<'+ self.key +'>>')
+        logger.get_logger().info('[+] Scraping content for query: <<%s>>', self.key)
+        self.progress = logger.ProgressReporter()
+        self.issue_count_checked = False
         self.__collect_issue_list_in_single_page(0)
         return self.queries[self.key]['output_filename'] if self.key in self.queries else '' 
         
         
-    def collect_comments(self, key, issues):
-        """ Collects issues with the parameters found in self.queries dict
+    def __collect_issue(self, issue_id, issue_type):
+        """ Scrapes metadata and comments of a single issue and returns the outcome
+            ('ok' or the reason of failure) and the content (None if failed)
+
+            Args:
+                issue_id (string) : id of the issue
+                issue_type (string) : type of the issue
+        """
+        issue_uri = self.__get_issue_uri(issue_id) 
+        logger.get_logger().debug('[*] Scraping %s', issue_uri)
+        
+        self.__create_driver(issue_uri)
+        if not self.driver: 
+            return 'no_driver', None
+
+        issue_root = self.__get_page('mr-issue-page')
+        if not issue_root: 
+            self.__quit_driver()
+            return 'no_issue_page', None
+         
+        issue_details_root = self.__expand_shadow_element_by_css_selector(issue_root, 
+                                                                          '.container-issue-content>.main-item')
+        if not issue_details_root: 
+            self.__quit_driver()
+            return 'no_issue_details', None
+    
+        content = self.__get_issue_id_and_title(issue_root)
+        content.update(self.__get_issue_metadata(issue_root))
+        content['issue_type'] = issue_type
+        content['issue_details'] = self.__get_issue_details(issue_details_root)
+        content['comments'] = self.__get_comments(issue_details_root)
+
+        self.__quit_driver()
+        return 'ok', content
+
+
+    def collect_issue(self, key, issue_id, issue_type):
+        """ Scrapes a single issue, returns the outcome ('ok' or the reason of failure)
+            and the content (None if failed). Exceptions raised while extracting
+            are logged and reported as 'error'.
 
            Args:
                 key (string) : key to be used to find query content in self.queries dictionary
-                issues (list) : a list of issue ids
+                issue_id (string) : id of the issue
+                issue_type (string) : type of the issue
         """
         self.key = key
-        self.__create_output_file()
-    
-        for issue_id in issues:
-            issue_uri = self.__get_issue_uri(issue_id) 
-            print ('[*] Scraping %s' %issue_uri)
-            
-            self.__create_driver(issue_uri)
-            if not self.driver: 
-                continue
+        try:
+            return self.__collect_issue(issue_id, issue_type)
+        except Exception:
+            logger.get_logger().exception('[-] Unable to scrape %s', issue_id)
+            self.__quit_driver()
+            return 'error', None
 
-            issue_root = self.__get_page('mr-issue-page')
-            if not issue_root: 
-                self.driver.quit()
-                continue
-             
-            issue_details_root = self.__expand_shadow_element_by_css_selector(issue_root, 
-                                                                              '.container-issue-content>.main-item')
-            if not issue_details_root: 
-                self.driver.quit()
-                continue
-        
-            content = self.__get_issue_id_and_title(issue_root)
-            content.update(self.__get_issue_metadata(issue_root))
-            content['issue_type'] = issues[issue_id]
-            content['issue_details'] = self.__get_issue_details(issue_details_root)
-            content['comments'] = self.__get_comments(issue_details_root)
 
-            self.driver.quit()
+    def __handle_issue_result(self, issue_id, outcome, content, duration):
+        """ Appends the content of a scraped issue to the output file, logs
+            the issue event and updates progress
+
+           Args:
+                issue_id (string) : id of the issue
+                outcome (string) : 'ok' or the reason of failure
+                content (dict) : issue details and a list of comments, None if failed
+                duration (float) : seconds spent on the issue
+        """
+        if content:
             self.__append_to_csv(content)
-            
\ No newline at end of file
+
+        logger.log_event('issue', issue_id=issue_id, outcome=outcome,
+                         comments=len(content['comments']) if content else 0,
+                         duration=round(duration, 3))
+        self.progress.update()
+
+
+    def collect_comments(self, key, issues, workers=0, **supervisor_options):
+        """ Collects issues with the parameters found in self.queries dict.
+            If 'workers' is provided, issues are scraped in supervised worker
+            processes (see supervisor.Supervisor)
+
+           Args:
+                key (string) : key to be used to find query content in self.queries dictionary
+                issues (list) : a list of issue ids
+                workers (int) : number of worker processes, 0 to scrape in this process
+                supervisor_options (dict) : options passed to supervisor.Supervisor
+        """
+        self.key = key
+        self.__create_output_file()
+        self.progress = logger.ProgressReporter(total=len(issues))
+
+        if workers:
+            supervisor.Supervisor(functools.partial(Scraper().collect_issue, key), workers=workers,
+                                  **supervisor_options).run(issues, self.__handle_issue_result)
+        else:
+            for issue_id in issues:
+                start_time = time.monotonic()
+                outcome, content = self.collect_issue(key, issue_id, issues[issue_id])
+                self.__handle_issue_result(issue_id, outcome, content, time.monotonic() - start_time)
+        self.progress.finish()
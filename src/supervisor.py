@@ -0,0 +1,359 @@
+"""
+Supervisor running scraping workers in child processes:
+    (*) each worker scrapes one issue at a time and reports back through its own pipe
+    (*) workers whose process group (worker, chromedriver and chrome, also after
+        they are reparented) exceeds the memory threshold, or whose page exceeds
+        the wall time limit, are killed and replaced, their in-flight issue is requeued
+    (*) crashed workers are replaced the same way
+    (*) workers are recycled after 'max_pages' issues
+    (*) workers kill themselves (and their browsers) if the supervisor dies
+"""
+
+# Generic/Built-in
+import os
+import time
+import pickle
+import signal
+import threading
+import logging
+import logging.handlers
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+# Owned
+import logger
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+__author__ = 'Selma Suloglu'
+__copyright__ = 'Copyright 2020'
+__credits__ = ['Selma Suloglu']
+__license__ = 'MIT'
+__version__ = '0.1.0'
+__maintainer__ = 'Selma Suloglu'
+__status__ = 'Dev'
+
+
+# seconds between checks of a worker whether the supervisor is alive
+PARENT_CHECK_INTERVAL = 5.0
+
+# seconds to wait for a killed worker to exit
+KILL_TIMEOUT = 10.0
+
+
+# {code}
+class PipeHandler(logging.handlers.QueueHandler):
+    """ Sends log records of a worker to the supervisor through the worker pipe. """
+    def __init__(self, conn):
+        logging.Handler.__init__(self)
+        self.conn = conn
+
+    def enqueue(self, record):
+        self.conn.send(('log', record))
+
+
+def worker_loop(target, conn, parent_conn, log_level):
+    """ Receives (issue_id, issue_type) tasks from 'conn' until None is received,
+        calls 'target' for each task and sends back its outcome and content.
+        Exits if the supervisor dies.
+
+        Args:
+            target (function) : target(issue_id, issue_type) returns (outcome, content)
+            conn (multiprocessing.connection.Connection) : worker end of the pipe
+            parent_conn (multiprocessing.connection.Connection) : supervisor end of the pipe,
+                                                                   closed so that recv gets EOF
+            log_level (int) : logging level
+    """
+    parent_conn.close()
+    parent_pid = os.getppid()
+
+    # own process group, so that chromedriver and chrome are killed with the worker
+    if hasattr(os, 'setsid'):
+        os.setsid()
+
+    worker_logger = logging.getLogger(logger.LOGGER_NAME)
+    worker_logger.handlers = [PipeHandler(conn)]
+    worker_logger.setLevel(log_level)
+    worker_logger.propagate = False
+
+    # the supervisor end may also be inherited by workers started later, so EOF
+    # alone does not tell that the supervisor is gone, also a page may hang
+    watchdog = threading.Thread(target=watch_parent, args=(parent_pid,))
+    watchdog.daemon = True
+    watchdog.start()
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        issue_id, issue_type = task
+        start_time = time.monotonic()
+        outcome, content = target(issue_id, issue_type)
+        conn.send(('done', issue_id, outcome, content, time.monotonic() - start_time))
+
+
+def watch_parent(parent_pid):
+    """ Kills the worker with its process group (chromedriver and chrome)
+        once the supervisor is gone, i.e. the worker is reparented
+
+        Args:
+            parent_pid (int) : process id of the supervisor
+    """
+    while os.getppid() == parent_pid:
+        time.sleep(PARENT_CHECK_INTERVAL)
+    if hasattr(os, 'killpg'):
+        os.killpg(0, signal.SIGKILL)
+    os._exit(1)
+
+
+def get_rss(pids):
+    """ Returns a dict with resident memory (bytes) of the process group led by
+        each pid in 'pids' (the process tree where there are no process groups,
+        i.e. Windows), or None if it can not be measured on this platform.
+        The process table is scanned once for all pids.
+
+        Args:
+            pids (list) : process ids of the workers
+    """
+    rss_by_group = {}
+    if psutil and hasattr(os, 'getpgid'):
+        for p in psutil.process_iter():
+            try:
+                pgid = os.getpgid(p.pid)
+                rss_by_group[pgid] = rss_by_group.get(pgid, 0) + p.memory_info().rss
+            except (psutil.Error, OSError):
+                continue
+
+    elif psutil:
+        for pid in pids:
+            try:
+                process = psutil.Process(pid)
+                rss_by_group[pid] = sum([p.memory_info().rss for p in [process] + process.children(recursive=True)])
+            except psutil.Error:
+                continue
+
+    elif os.path.isdir('/proc'):
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        for p in os.listdir('/proc'):
+            if not p.isdigit():
+                continue
+            try:
+                with open('/proc/%s/stat' %p) as f:
+                    # fields after the command name: state, ppid, pgrp, ... rss is the 22nd
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except (IOError, IndexError):
+                continue
+            pgid = int(fields[2])
+            rss_by_group[pgid] = rss_by_group.get(pgid, 0) + int(fields[21]) * page_size
+
+    else:
+        return None
+
+    return {pid: rss_by_group.get(pid, 0) for pid in pids}
+
+
+class Supervisor():
+    """ Distributes issues to worker processes and keeps the workers healthy. """
+    def __init__(self, target, workers=2, max_rss_mb=2048, page_timeout=300,
+                 max_pages=500, max_attempts=3, poll_interval=2.0):
+        """ Args:
+                target (function) : target(issue_id, issue_type) returns (outcome, content),
+                                    called in worker processes
+                workers (int) : number of worker processes
+                max_rss_mb (int) : memory threshold (MB) of a worker's process group
+                page_timeout (float) : maximum number of seconds spent on an issue
+                max_pages (int) : number of issues after which a worker is recycled
+                max_attempts (int) : number of times an issue is tried before it is abandoned
+                poll_interval (float) : number of seconds between health checks
+        """
+        self.target = target
+        self.workers = workers
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.page_timeout = page_timeout
+        self.max_pages = max_pages
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.context = multiprocessing.get_context()
+        self.log = logger.get_logger()
+
+
+    def __start_worker(self):
+        """ Starts a worker process and returns its state
+        """
+        conn, worker_conn = self.context.Pipe()
+        process = self.context.Process(target=worker_loop,
+                                       args=(self.target, worker_conn, conn, self.log.getEffectiveLevel()))
+        process.daemon = True
+        process.start()
+        worker_conn.close()
+        self.log.debug('[+] Worker %d started', process.pid)
+        return {'process': process, 'conn': conn, 'issue_id': None, 'start_time': None, 'pages': 0}
+
+
+    def __kill_worker(self, worker):
+        """ Kills the worker with its process group (chromedriver and chrome)
+
+            Args:
+                worker (dict) : worker state
+        """
+        process = worker['process']
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # no process groups on this platform, or the worker has not
+            # called setsid yet (or its group is already gone)
+            process.kill()
+        process.join(KILL_TIMEOUT)
+        if process.is_alive():
+            self.log.warning('[-] Worker %d did not exit after SIGKILL', process.pid)
+        worker['conn'].close()
+
+
+    def __stop_worker(self, worker):
+        """ Asks an idle worker to exit and waits for it
+
+            Args:
+                worker (dict) : worker state
+        """
+        try:
+            worker['conn'].send(None)
+        except (OSError, EOFError):
+            pass
+        worker['process'].join(self.poll_interval)
+        if worker['process'].is_alive():
+            self.__kill_worker(worker)
+        else:
+            worker['conn'].close()
+
+
+    def __requeue(self, worker, reason):
+        """ Requeues the in-flight issue of a killed or crashed worker, or
+            abandons it after 'max_attempts'
+
+            Args:
+                worker (dict) : worker state
+                reason (string) : why the worker was replaced
+        """
+        issue_id = worker['issue_id']
+        if issue_id is None:
+            return
+        self.log.warning('[-] Worker %d replaced (%s) while scraping %s',
+                         worker['process'].pid, reason, issue_id)
+        if self.attempts[issue_id] < self.max_attempts:
+            self.pending.appendleft(issue_id)
+        else:
+            self.on_result(issue_id, reason, None, time.monotonic() - worker['start_time'])
+
+
+    def __check_health(self, worker, rss):
+        """ Returns the reason if the worker has to be replaced, None otherwise
+
+            Args:
+                worker (dict) : worker state
+                rss (int) : resident memory (bytes) of the worker's process group,
+                            None if it can not be measured
+        """
+        if not worker['process'].is_alive():
+            return 'crashed'
+        if worker['issue_id'] is not None and time.monotonic() - worker['start_time'] > self.page_timeout:
+            return 'timeout'
+        if rss is not None and rss > self.max_rss:
+            self.log.warning('[-] Worker %d uses %d MB', worker['process'].pid, rss // (1024 * 1024))
+            return 'memory'
+        return None
+
+
+    def __receive(self, worker):
+        """ Handles messages (log records and results) sent by the worker,
+            returns False if the worker pipe is broken
+
+            Args:
+                worker (dict) : worker state
+        """
+        conn = worker['conn']
+        while True:
+            try:
+                if not conn.poll():
+                    return True
+                message = conn.recv()
+            except (EOFError, OSError, pickle.UnpicklingError):
+                return False
+
+            if message[0] == 'log':
+                self.log.handle(message[1])
+                continue
+
+            _, issue_id, outcome, content, duration = message
+            worker['issue_id'] = None
+            worker['pages'] += 1
+            self.on_result(issue_id, outcome, content, duration)
+
+
+    def run(self, tasks, on_result):
+        """ Scrapes all tasks with worker processes and calls
+            on_result(issue_id, outcome, content, duration) in this process
+            for each of them
+
+            Args:
+                tasks (dict) : issue ids (keys) and issue types (values)
+                on_result (function) : called with the result of each issue
+        """
+        self.on_result = on_result
+        self.pending = deque(tasks)
+        self.attempts = {issue_id: 0 for issue_id in tasks}
+        if get_rss([]) is None:
+            self.log.warning('[-] Unable to measure memory on this platform, memory based recycling is disabled')
+
+        workers = []
+        try:
+            workers.extend([self.__start_worker() for _ in range(min(self.workers, len(tasks)))])
+            last_check = time.monotonic()
+            while self.pending or any([w['issue_id'] is not None for w in workers]):
+                # assign tasks to idle workers
+                for w in workers:
+                    if w['issue_id'] is None and self.pending:
+                        issue_id = self.pending.popleft()
+                        self.attempts[issue_id] += 1
+                        w['issue_id'], w['start_time'] = issue_id, time.monotonic()
+                        try:
+                            w['conn'].send((issue_id, tasks[issue_id]))
+                        except OSError:
+                            # worker died, handled as crashed below
+                            pass
+
+                wait([w['conn'] for w in workers], timeout=self.poll_interval)
+
+                # one scan of the process table for all workers
+                check = time.monotonic() - last_check >= self.poll_interval
+                rss = (get_rss([w['process'].pid for w in workers]) if check else None) or {}
+
+                for i, w in enumerate(workers):
+                    reason = None if self.__receive(w) else 'crashed'
+                    if not reason and check:
+                        reason = self.__check_health(w, rss.get(w['process'].pid))
+                    if reason:
+                        self.__kill_worker(w)
+                        self.__requeue(w, reason)
+                        workers[i] = self.__start_worker()
+                    elif w['issue_id'] is None and w['pages'] >= self.max_pages and self.pending:
+                        self.log.debug('[*] Worker %d recycled after %d issues', w['process'].pid, w['pages'])
+                        self.__stop_worker(w)
+                        workers[i] = self.__start_worker()
+                if check:
+                    last_check = time.monotonic()
+
+            for w in workers:
+                self.__stop_worker(w)
+        finally:
+            # also on errors and Ctrl-C: workers run in their own session and
+            # do not receive the terminal's SIGINT, kill what is left of them
+            for w in workers:
+                self.__kill_worker(w)